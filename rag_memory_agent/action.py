@@ -1,7 +1,18 @@
 from __future__ import annotations
+import re
 from typing import Dict, Any
 from .core import search_documents_core, index_page_core
 
+# Precompiled once: plan kind + payload, and quoted/bare key=value arguments
+# (quoted values may contain '|', which the old split-based parser broke on).
+_PLAN_PAT = re.compile(r'^(FUNCTION_CALL|FINAL_ANSWER):\s*(.*)$', re.S)
+_ARG_PAT  = re.compile(r'(\w+)="([^"]*)"|(\w+)=([^|]*)')
+
+_DISPATCH = {
+    "search_documents": lambda a: search_documents_core(a.get("query", ""), int(a.get("top_k", "5"))),
+    "index_page": lambda a: index_page_core(a.get("url", ""), a.get("title", ""), a.get("text", "")),
+}
+
 
 def execute(plan: str) -> Dict[str, Any]:
     """
@@ -9,34 +20,23 @@ def execute(plan: str) -> Dict[str, Any]:
       FUNCTION_CALL: search_documents|query="..."|top_k=5
       FINAL_ANSWER: ...
     """
-    plan = plan.strip()
-    if plan.startswith("FINAL_ANSWER:"):
-        return {"type":"final", "data": plan.split(":",1)[1].strip()}
-
-    if not plan.startswith("FUNCTION_CALL:"):
+    m = _PLAN_PAT.match(plan.strip())
+    if not m:
         return {"type":"final", "data": "(no-op)"}
+    kind, rest = m.groups()
+    if kind == "FINAL_ANSWER":
+        return {"type":"final", "data": rest.strip()}
 
-    _, rest = plan.split(":", 1)
-    rest = rest.strip()
-    fn, *argparts = rest.split("|")
-    fn = fn.strip()
+    fn, _, argstr = rest.partition("|")
+    handler = _DISPATCH.get(fn.strip())
+    if handler is None:
+        return {"type":"final", "data": "(unknown tool)"}
 
     args: Dict[str, Any] = {}
-    for part in argparts:
-        if "=" in part:
-            k, v = part.split("=", 1)
-            v = v.strip()
-            if v.startswith('"') and v.endswith('"'):
-                v = v[1:-1]
-            args[k.strip()] = v
-
-    if fn == "search_documents":
-        q = args.get("query","")
-        top_k = int(args.get("top_k","5"))
-        return {"type": "tool_output", "data": search_documents_core(q, top_k)}
-    elif fn == "index_page":
-        return {"type":"tool_output", "data": index_page_core(
-            args.get("url",""), args.get("title",""), args.get("text","")
-        )}
-
-    return {"type":"final", "data": "(unknown tool)"}
\ No newline at end of file
+    for am in _ARG_PAT.finditer(argstr):
+        kq, vq, kb, vb = am.groups()
+        if kq is not None:
+            args[kq] = vq
+        else:
+            args[kb] = vb.strip()
+    return {"type": "tool_output", "data": handler(args)}
@@ -1,9 +1,17 @@
 from __future__ import annotations
-from .perception import perceive
+import threading
+from .config import GEMINI_API_KEY
+from .perception import perceive, _gemini_client_once
 from .memory import STM, MemoryItem
 from .decision import decide
 from .action import execute
 
+# Prewarm: importing google.genai costs ~200-500ms, which the lazy import
+# would otherwise push onto the first user request. Kick it off here so it
+# finishes while the user types; _gemini_client_once is idempotent.
+if GEMINI_API_KEY:
+    threading.Thread(target=_gemini_client_once, daemon=True).start()
+
 def run_once(user_text: str, session_id: str = "cli"):
     p = perceive(user_text)
     STM.add(MemoryItem(type="query", content=p.cleaned_query, session_id=session_id))
@@ -17,6 +17,24 @@ GEMINI_API_KEY      = os.getenv("GEMINI_API_KEY", GOOGLE_API_KEY)  # fallback
 GEMINI_MODEL_DECISION   = os.getenv("GEMINI_MODEL_DECISION", "gemini-2.0-flash")
 GEMINI_MODEL_PERCEPTION = os.getenv("GEMINI_MODEL_PERCEPTION", "gemini-2.0-flash")
 
+# Cap concurrent Gemini requests (match your account's RPM tier) so bursts
+# don't trip 429s whose retries make latency worse than the queueing
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "15"))
+
+# ---------- Perception ----------
+# Memoize perceive() results for identical inputs (near-deterministic at temp 0.2)
+PERCEPTION_CACHE_ENABLED = os.getenv("PERCEPTION_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+PERCEPTION_CACHE_SIZE    = int(os.getenv("PERCEPTION_CACHE_SIZE", "1024"))
+# Semantic cache: serve near-duplicate phrasings from prior results (opt-in,
+# needs the embedding backend up; embeddings are ~100x cheaper than generation)
+PERCEPTION_SEMCACHE_ENABLED   = os.getenv("PERCEPTION_SEMCACHE_ENABLED", "0").lower() in ("1", "true", "yes")
+PERCEPTION_SEMCACHE_THRESHOLD = float(os.getenv("PERCEPTION_SEMCACHE_THRESHOLD", "0.92"))
+PERCEPTION_SEMCACHE_SIZE      = int(os.getenv("PERCEPTION_SEMCACHE_SIZE", "512"))
+# Disk tier behind the in-memory LRU: survives restarts so cold starts don't
+# re-pay Gemini calls for known inputs
+PERCEPTION_DISK_CACHE_ENABLED = os.getenv("PERCEPTION_DISK_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+PERCEPTION_DISK_CACHE_TTL     = int(os.getenv("PERCEPTION_DISK_CACHE_TTL", str(7 * 86400)))  # seconds
+
 # ---------- Embeddings ----------
 EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "ollama").lower()  # "google" or "ollama"
 
@@ -25,11 +43,19 @@ GOOGLE_EMBED_MODEL = os.getenv("GOOGLE_EMBED_MODEL", "text-embedding-004")
 
 # --- Ollama Embeddings ---
 EMBED_URL   = os.getenv("EMBED_URL", "http://localhost:11434/api/embeddings")
+# Batch endpoint (one forward pass for N inputs); older Ollama servers lack it
+EMBED_BATCH_URL = os.getenv("EMBED_BATCH_URL", EMBED_URL.replace("/api/embeddings", "/api/embed"))
 EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))  # parallel requests to Ollama
 
 # ---------- Chunking / Index ----------
 CHUNK_SIZE      = int(os.getenv("CHUNK_SIZE", "900"))
 CHUNK_OVERLAP   = int(os.getenv("CHUNK_OVERLAP", "160"))
+# Token-aware chunking (opt-in): name a HF tokenizer (e.g. "bert-base-uncased")
+# to size windows in token space; empty string keeps character-based chunks.
+CHUNK_TOKENIZER     = os.getenv("CHUNK_TOKENIZER", "")
+CHUNK_TOKENS        = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_TOKEN_OVERLAP = int(os.getenv("CHUNK_TOKEN_OVERLAP", "64"))  # stride = tokens - overlap
 RECENCY_ALPHA   = float(os.getenv("RECENCY_ALPHA", "0.05"))
 
 # --- Temporal ranking knobs ---
@@ -44,13 +70,27 @@ FRESHNESS_WEIGHT  = float(os.getenv("FRESHNESS_WEIGHT", "0.7"))
 POPULARITY_WEIGHT = float(os.getenv("POPULARITY_WEIGHT", "0.3"))
 
 
+# --- FAISS index type ---
+INDEX_KIND           = os.getenv("FAISS_INDEX_KIND", "hnsw").lower()  # "hnsw", "sq8", or "flat"
+HNSW_M               = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+
 # ---------- Optional tuning ----------
 EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # for Google
 MAX_CHUNKS_PER_DOC = int(os.getenv("MAX_CHUNKS_PER_DOC", "500"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 4)))  # doc conversion threads
 
 # ---------- Derived paths ----------
 INDEX_PATH = FAISS_DIR / "index.bin"
 META_PATH  = FAISS_DIR / "metadata.jsonl"
+# Mutable per-chunk fields live in flat binary sidecars (O(1) in-place updates)
+VISITS_PATH    = FAISS_DIR / "visits.i4"
+LAST_SEEN_PATH = FAISS_DIR / "last_seen.f8"
+# Hot columns persisted append-only so _load can skip parsing metadata.jsonl
+URLS_PATH   = FAISS_DIR / "urls.txt"
+HASHES_PATH = FAISS_DIR / "hashes.txt"
+TS_PATH     = FAISS_DIR / "ts.f8"
+PERCEPTION_DB_PATH = FAISS_DIR / "perception_cache.sqlite"
 
 FAISS_DIR.mkdir(parents=True, exist_ok=True)
 DOCS_DIR.mkdir(parents=True, exist_ok=True)
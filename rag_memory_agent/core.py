@@ -1,5 +1,6 @@
 from __future__ import annotations
-import os, json, time, hashlib
+import os, json, time, hashlib, mmap, threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 from datetime import datetime
@@ -8,18 +9,98 @@ import numpy as np
 import faiss
 import math
 
+# orjson (C, SIMD) parses/serializes rows 3-10x faster than stdlib json;
+# fall back transparently when it isn't installed.
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps_line(row: dict) -> str:
+        return orjson.dumps(row).decode()
+except ImportError:
+    _loads = json.loads
+    def _dumps_line(row: dict) -> str:
+        return json.dumps(row, ensure_ascii=False)
+
 
 from .config import (
     FAISS_DIR, INDEX_PATH, MAX_CHUNKS_PER_DOC, META_PATH, EMBEDDINGS_PROVIDER,
-    GOOGLE_API_KEY, EMBED_URL, EMBED_MODEL,
+    VISITS_PATH, LAST_SEEN_PATH, URLS_PATH, HASHES_PATH, TS_PATH,
+    INDEX_KIND, HNSW_M, HNSW_EF_CONSTRUCTION,
+    GOOGLE_API_KEY, EMBED_URL, EMBED_BATCH_URL, EMBED_MODEL, EMBED_CONCURRENCY,
     GOOGLE_EMBED_MODEL, EMBED_BATCH_SIZE,
-    CHUNK_SIZE, CHUNK_OVERLAP, 
+    CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_TOKENIZER, CHUNK_TOKENS, CHUNK_TOKEN_OVERLAP,
     HALF_LIFE_DAYS, FRESHNESS_WEIGHT, POPULARITY_WEIGHT, MAX_TEMPORAL_BOOST, SIM_WEIGHT,
-    TEMP_WEIGHT
+    TEMP_WEIGHT, INGEST_WORKERS
 )
 # ---------- Embeddings ----------
 _embedder = None
 
+# Persistent loop + pooled client so the keep-alive socket to Ollama survives
+# across _embed_batch calls (no TCP handshake per batch, retries on transient errors).
+_ollama_loop = None
+_ollama_client = None
+
+def _ollama_client_once():
+    global _ollama_client
+    if _ollama_client is None:
+        import httpx
+        _ollama_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60, connect=5),
+            limits=httpx.Limits(
+                max_connections=EMBED_CONCURRENCY,
+                max_keepalive_connections=EMBED_CONCURRENCY,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=3),
+            headers={"Connection": "keep-alive"},
+        )
+    return _ollama_client
+
+_ollama_lock = threading.Lock()
+
+def _run_async(coro):
+    """Run a coroutine on a reusable module-level loop (keeps pooled connections alive)."""
+    global _ollama_loop
+    import asyncio
+    with _ollama_lock:  # the loop can only run in one thread at a time
+        if _ollama_loop is None:
+            _ollama_loop = asyncio.new_event_loop()
+        return _ollama_loop.run_until_complete(coro)
+
+# Set to False once the server 404s on /api/embed (older Ollama)
+_batch_endpoint_ok = True
+
+async def _embed_ollama_async(texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts against Ollama, preferring the batch /api/embed endpoint
+    (one forward pass for all inputs). Older servers without it fall back
+    to up to EMBED_CONCURRENCY concurrent per-prompt requests, with results
+    returned in input order via the preallocated `out` slots.
+    """
+    global _batch_endpoint_ok
+    import asyncio
+
+    client = _ollama_client_once()
+
+    if _batch_endpoint_ok:
+        r = await client.post(EMBED_BATCH_URL, json={"model": EMBED_MODEL, "input": texts})
+        if r.status_code == 404:
+            _batch_endpoint_ok = False  # older Ollama; use per-prompt path below
+        else:
+            r.raise_for_status()
+            return r.json()["embeddings"]
+
+    out: List[List[float]] = [None] * len(texts)  # type: ignore[list-item]
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def one(i: int, t: str):
+        async with sem:
+            r = await client.post(EMBED_URL, json={"model": EMBED_MODEL, "prompt": t})
+            r.raise_for_status()
+            out[i] = r.json()["embedding"]
+
+    await asyncio.gather(*(one(i, t) for i, t in enumerate(texts)))
+    return out
+
 def _embed_batch(texts: List[str]) -> np.ndarray:
     """
     Returns L2-normalized float32 embeddings for texts.
@@ -45,49 +126,183 @@ def _embed_batch(texts: List[str]) -> np.ndarray:
         vecs = _embedder.get_text_embedding_batch(texts)
         arr = np.array(vecs, dtype="float32")
     else:
-        # ---------- Ollama local embeddings ----------
-        import requests
-        arr = []
-        for t in texts:
-            r = requests.post(
-                EMBED_URL,
-                json={"model": EMBED_MODEL, "prompt": t},
-                timeout=60,
-            )
-            r.raise_for_status()
-            v = np.array(r.json()["embedding"], dtype="float32")
-            arr.append(v)
-        arr = np.stack(arr, axis=0)
+        # ---------- Ollama local embeddings (batched, pooled) ----------
+        vecs = _run_async(_embed_ollama_async(texts))
+        arr = np.asarray(vecs, dtype="float32")
+
+    # normalize in place for cosine/IP equivalence (single pass, no copy of arr)
+    sq = np.einsum("ij,ij->i", arr, arr)
+    np.sqrt(sq, out=sq)
+    sq[sq == 0.0] = 1.0
+    arr /= sq[:, None]
+    return arr
 
-    # normalize for cosine/IP equivalence
-    norms = np.linalg.norm(arr, axis=1, keepdims=True)
-    norms[norms == 0.0] = 1.0
-    return arr / norms
+# LRU cache of query embeddings: repeat queries (retries, refreshes) skip the
+# embed round-trip entirely. Values are stored as compact float32 bytes.
+_query_vec_cache: OrderedDict[Tuple[str, str], bytes] = OrderedDict()
+_QUERY_CACHE_MAX = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+
+def _embed_queries_cached(queries: List[str]) -> np.ndarray:
+    """Like _embed_batch(queries) but memoized per (model, query)."""
+    keys = [(EMBED_MODEL, q) for q in queries]
+    misses = [i for i, k in enumerate(keys) if k not in _query_vec_cache]
+    if misses:
+        vecs = _embed_batch([queries[i] for i in misses])
+        for j, i in enumerate(misses):
+            _query_vec_cache[keys[i]] = vecs[j].tobytes()
+            if len(_query_vec_cache) > _QUERY_CACHE_MAX:
+                _query_vec_cache.popitem(last=False)
+    rows = []
+    for k in keys:
+        _query_vec_cache.move_to_end(k)
+        rows.append(np.frombuffer(_query_vec_cache[k], dtype="f4"))
+    return np.stack(rows, axis=0)
 
 # ---------- FAISS + metadata ----------
+class _LazyMeta:
+    """
+    List-like view over metadata.jsonl. The file is memory-mapped and a line
+    offset table is built in one vectorized pass; rows are JSON-parsed (and
+    cached) only when actually accessed, so startup no longer pays a full
+    parse of every row. Rows appended after load live in an in-memory tail.
+    """
+    def __init__(self, path: Path):
+        self._tail: List[Dict[str, Any]] = []
+        self._cache: Dict[int, Dict[str, Any]] = {}
+        self._buf = None
+        self._starts = self._ends = np.zeros(0, dtype="i8")
+        if path.exists() and path.stat().st_size:
+            with path.open("rb") as f:
+                self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            raw = np.frombuffer(self._buf, dtype=np.uint8)
+            ends = np.nonzero(raw == 0x0A)[0]
+            if raw.size and raw[-1] != 0x0A:  # tolerate a missing final newline
+                ends = np.append(ends, raw.size)
+            self._ends = ends
+            self._starts = np.concatenate([np.zeros(1, dtype="i8"), ends[:-1] + 1]) if ends.size else ends
+
+    def __len__(self) -> int:
+        return len(self._ends) + len(self._tail)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        n = len(self._ends)
+        if i >= n:
+            return self._tail[i - n]
+        row = self._cache.get(i)
+        if row is None:
+            row = self._cache[i] = _loads(self._buf[self._starts[i]:self._ends[i]])
+        return row
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def extend(self, rows: List[Dict[str, Any]]) -> None:
+        self._tail.extend(rows)
+
+# Struct-of-arrays layout: hot per-row fields live in parallel columns so the
+# search/visit/dedup paths never touch the (lazy) row dicts; full rows are only
+# parsed for cold fields (title, snippet, chunk) at result-serialization time.
 _index: faiss.Index | None = None
-_meta:  List[Dict[str, Any]] = []
+_meta:  _LazyMeta | None = None
+_chunk_hashes: set[str] = set()  # dedup keys, kept in sync with _meta
+_urls: List[str] = []  # url column, one slot per row
+_url_to_idxs: Dict[str, List[int]] = {}  # url -> row indices, kept in sync with _meta
+_visits:    np.ndarray | None = None  # int32 memmap, one slot per row
+_last_seen: np.ndarray | None = None  # float64 epoch-sec memmap, one slot per row
+_ts_sec:    np.ndarray | None = None  # float64 index-time epoch secs, one slot per row
+
+def _parse_ts(ts: str | None) -> float:
+    # Stored strings are UTC ("...Z"); map Z to an explicit offset so the
+    # naive-datetime path (which .timestamp() reads as *local* time) is never
+    # taken and round-trips through utcfromtimestamp stay exact on any host.
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp() if ts else time.time()
+    except Exception:
+        return time.time()
+
+def _sidecar(path: Path, dtype: str, n: int) -> np.ndarray:
+    """Open (growing with zeros if needed) a flat binary array of n entries."""
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+    itemsize = np.dtype(dtype).itemsize
+    size = path.stat().st_size if path.exists() else 0
+    if size < n * itemsize:
+        with path.open("ab") as f:
+            f.write(b"\x00" * (n * itemsize - size))
+    return np.memmap(path, dtype=dtype, mode="r+", shape=(n,))
+
+# GPU resources, created lazily; stays None on faiss-cpu builds
+_gpu_res = None
+
+def _maybe_to_gpu(index: faiss.Index) -> faiss.Index:
+    """Move the index to GPU 0 when a GPU-enabled faiss is available."""
+    global _gpu_res
+    try:
+        if _gpu_res is None:
+            _gpu_res = faiss.StandardGpuResources()
+        return faiss.index_cpu_to_gpu(_gpu_res, 0, index)
+    except Exception:
+        # faiss-cpu build, no device, or index type without GPU support
+        return index
+
+def _to_cpu(index: faiss.Index) -> faiss.Index:
+    if _gpu_res is not None:
+        try:
+            return faiss.index_gpu_to_cpu(index)
+        except Exception:
+            pass
+    return index
 
 def _load():
     """Load index + metadata into memory (lazy)."""
-    global _index, _meta
+    global _index, _meta, _chunk_hashes, _urls, _visits, _last_seen, _ts_sec
     if INDEX_PATH.exists():
-        _index = faiss.read_index(str(INDEX_PATH))
+        _index = _maybe_to_gpu(faiss.read_index(str(INDEX_PATH)))
     else:
         _index = None
-    if META_PATH.exists():
-        with META_PATH.open("r", encoding="utf-8") as f:
-            _meta = [json.loads(line) for line in f]
-    else:
-        _meta = []
+    _meta = _LazyMeta(META_PATH)
+    n = len(_meta)
+
+    # Fast path: hot columns come from append-only sidecars, so startup
+    # doesn't JSON-parse a single metadata row.
+    urls = URLS_PATH.read_text(encoding="utf-8").splitlines() if URLS_PATH.exists() else []
+    hashes = HASHES_PATH.read_text(encoding="utf-8").splitlines() if HASHES_PATH.exists() else []
+    _ts_sec = _sidecar(TS_PATH, "f8", n)
+    if len(urls) != n or len(hashes) != n:
+        # Sidecars missing or stale (metadata predates them): parse once, rebuild.
+        urls = [m.get("url", "") for m in _meta]
+        hashes = [m.get("chunk_hash", "") for m in _meta]
+        URLS_PATH.write_text("".join(u + "\n" for u in urls), encoding="utf-8")
+        HASHES_PATH.write_text("".join(h + "\n" for h in hashes), encoding="utf-8")
+        _ts_sec[:] = [_parse_ts(m.get("timestamp")) for m in _meta]
+        if isinstance(_ts_sec, np.memmap):
+            _ts_sec.flush()
+
+    _chunk_hashes = {h for h in hashes if h}
+    _urls = urls
+    _url_to_idxs.clear()
+    for i, u in enumerate(_urls):
+        _url_to_idxs.setdefault(u, []).append(i)
+
+    _visits = _sidecar(VISITS_PATH, "i4", n)
+    _last_seen = _sidecar(LAST_SEEN_PATH, "f8", n)
+    # Seed slots that predate the sidecars (visits is always >= 1 once set)
+    for i in np.nonzero(_visits == 0)[0]:
+        m = _meta[i]
+        _visits[i] = int(m.get("visits", 1))
+        _last_seen[i] = _parse_ts(m.get("last_seen") or m.get("timestamp"))
 
 def _save():
-    """Persist index + metadata."""
+    """Persist index + mutable sidecars (metadata rows are append-only)."""
     if _index is not None:
-        faiss.write_index(_index, str(INDEX_PATH))
-    with META_PATH.open("w", encoding="utf-8") as f:
-        for row in _meta:
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        faiss.write_index(_to_cpu(_index), str(INDEX_PATH))
+    if isinstance(_visits, np.memmap):
+        _visits.flush()
+    if isinstance(_last_seen, np.memmap):
+        _last_seen.flush()
+    if isinstance(_ts_sec, np.memmap):
+        _ts_sec.flush()
 
 def _ensure_loaded():
     global _index
@@ -95,17 +310,90 @@ def _ensure_loaded():
         _load()
 
 def _append(vecs: np.ndarray, rows: List[Dict[str, Any]]):
-    global _index, _meta
+    global _index, _meta, _visits, _last_seen, _ts_sec
     if _index is None:
         dim = vecs.shape[1]
-        # Use IP (cosine-equivalent due to normalization)
-        _index = faiss.IndexFlatIP(dim)
+        # IP metric throughout (cosine-equivalent due to normalization).
+        # HNSW searches sub-linearly and still supports incremental add()
+        # without a train() step; "flat" keeps exact brute force.
+        if INDEX_KIND == "hnsw":
+            _index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            _index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        elif INDEX_KIND == "sq8":
+            # int8-quantized storage: 4x smaller than float32 and roughly 2x
+            # search throughput (brute force is memory-bandwidth-bound)
+            _index = faiss.IndexScalarQuantizer(
+                dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            _index = _maybe_to_gpu(faiss.IndexFlatIP(dim))
+    if not _index.is_trained:
+        # SQ training just estimates per-dim ranges; the first batch suffices
+        # and later adds stay incremental without retraining.
+        _index.train(vecs)
     _index.add(vecs)
+    base = len(_meta)
     _meta.extend(rows)
+    _chunk_hashes.update(r["chunk_hash"] for r in rows)
+    for i, r in enumerate(rows, start=base):
+        _urls.append(r.get("url", ""))
+        _url_to_idxs.setdefault(r.get("url", ""), []).append(i)
+    # Append-only writes: only the new rows (and their hot columns) hit disk
+    with META_PATH.open("a", encoding="utf-8") as f:
+        f.writelines(_dumps_line(r) + "\n" for r in rows)
+    with URLS_PATH.open("a", encoding="utf-8") as f:
+        f.writelines(r.get("url", "") + "\n" for r in rows)
+    with HASHES_PATH.open("a", encoding="utf-8") as f:
+        f.writelines(r["chunk_hash"] + "\n" for r in rows)
+    # Rows of one page share the same ISO strings — parse each distinct one once
+    ts_memo: Dict[str, float] = {}
+    def _ts_of(s: str | None) -> float:
+        if s not in ts_memo:
+            ts_memo[s] = _parse_ts(s)
+        return ts_memo[s]
+    _ts_sec = _sidecar(TS_PATH, "f8", len(_meta))
+    for i, r in enumerate(rows, start=base):
+        _ts_sec[i] = _ts_of(r.get("timestamp"))
+    _visits = _sidecar(VISITS_PATH, "i4", len(_meta))
+    _last_seen = _sidecar(LAST_SEEN_PATH, "f8", len(_meta))
+    for i, r in enumerate(rows, start=base):
+        _visits[i] = int(r.get("visits", 1))
+        _last_seen[i] = _ts_of(r.get("last_seen") or r.get("timestamp"))
     _save()
 
 # ---------- Chunking ----------
+_tokenizer = None
+
+def _tokenizer_once():
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError(
+                "tokenizers not found but CHUNK_TOKENIZER is set. "
+                "Install with: pip install rag-memory-agent[tokenize]"
+            )
+        _tokenizer = Tokenizer.from_pretrained(CHUNK_TOKENIZER)
+    return _tokenizer
+
+def _token_chunks(text: str, k=CHUNK_TOKENS, overlap=CHUNK_TOKEN_OVERLAP):
+    """Sliding window in token space; offsets map spans back to character space."""
+    # No special tokens: [CLS]/[SEP] carry (0, 0) offsets, so a window ending
+    # on one would compute end=0 and be dropped by the end > start guard.
+    enc = _tokenizer_once().encode(text, add_special_tokens=False)
+    ids, offsets = enc.ids, enc.offsets
+    step = max(1, k - overlap)
+    for i in range(0, len(ids), step):
+        start = offsets[i][0]
+        end = offsets[min(i + k, len(ids)) - 1][1]
+        if end > start:
+            yield start, text[start:end]
+
 def _chunks(text: str, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    if CHUNK_TOKENIZER:
+        yield from _token_chunks(text)
+        return
     i = 0
     n = len(text)
     while i < n:
@@ -120,143 +408,197 @@ def visit_url_core(url: str) -> dict:
     Returns {ok, url, visits} where visits is the max count across this URL's chunks.
     """
     _ensure_loaded()
-    now_iso = datetime.utcnow().isoformat() + "Z"
-    found = False
-    max_visits = 0
-    for row in _meta:
-        if row.get("url") == url:
-            found = True
-            row["last_seen"] = now_iso
-            v = int(row.get("visits", 0)) + 1
-            row["visits"] = v
-            max_visits = max(max_visits, v)
-
-    if not found:
+    idxs = _url_to_idxs.get(url)
+    if not idxs:
         return {"ok": False, "url": url, "visits": 0, "reason": "url_not_indexed"}
 
-    _save()
+    now = time.time()
+    max_visits = 0
+    for i in idxs:
+        _last_seen[i] = now
+        v = int(_visits[i]) + 1
+        _visits[i] = v
+        max_visits = max(max_visits, v)
+
+    # Only the tiny sidecars need flushing — no metadata rewrite
+    if isinstance(_visits, np.memmap):
+        _visits.flush()
+    if isinstance(_last_seen, np.memmap):
+        _last_seen.flush()
     return {"ok": True, "url": url, "visits": max_visits}
 
 # ---------- Public core APIs ----------
 def index_page_core(url: str, title: str, text: str) -> Dict[str, Any]:
     """
     Chunk -> embed -> append to FAISS; write metadata.jsonl
+    Chunks stream through in EMBED_BATCH_SIZE groups: while one batch embeds
+    on a worker thread, the next is chunked and hashed, so chunking overlaps
+    the network wait and peak memory stays bounded regardless of doc size.
     Returns {ok, indexed_chunks, url, title}
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     _ensure_loaded()
     ts = datetime.utcnow().isoformat() + "Z"
-    base = hashlib.sha1(url.encode()).hexdigest()[:10]
+    # blake2b is much faster than SHA-1 for short inputs; these are dedup
+    # keys, not security hashes. Encode the url once, not per chunk.
+    url_b = url.encode()
+    base = hashlib.blake2b(url_b, digest_size=5).hexdigest()
+
+    seen = set()  # same-page dedup; _chunk_hashes covers prior pages
 
-    rows, payloads = [], []
-    existing = {m.get("chunk_hash") for m in _meta if "chunk_hash" in m}
-    
-    prior = [m for m in _meta if m.get("url") == url]
-    prior_visits = max([int(m.get("visits", 0)) for m in prior], default=0)
+    prior_visits = max((int(_visits[i]) for i in _url_to_idxs.get(url, ())), default=0)
     visits_init = max(1, prior_visits)  # keep at least 1
 
+    indexed = 0
+    batch_rows: List[Dict[str, Any]] = []
+    batch_payloads: List[str] = []
+    pending: Tuple[Any, List[Dict[str, Any]]] | None = None  # (future, rows)
 
-    for off, chunk in _chunks(text):
-        if len(rows) >= MAX_CHUNKS_PER_DOC:
-            break
-        ch = hashlib.sha1((url + str(off) + chunk).encode()).hexdigest()[:16]
-        if ch in existing:
-            continue
-        rows.append({
-            "url": url,
-            "title": title,
-            "timestamp": ts,
-            "chunk_id": f"{base}#c{len(rows):04d}",
-            "offset_start": off,
-            "snippet": chunk[:240],
-            "chunk_hash": ch,
-            "chunk": chunk,
-            "visits": visits_init,
-            "last_seen": ts
-        })
-        payloads.append(chunk)
-
-    if not payloads:
-        return {"ok": True, "indexed_chunks": 0, "url": url, "title": title}
-
-    vecs = _embed_batch(payloads)
-    _append(vecs, rows)
-    return {"ok": True, "indexed_chunks": len(rows), "url": url, "title": title}
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        def flush():
+            # Drain the in-flight batch (index adds stay on this thread),
+            # then hand the freshly built one to the embed worker.
+            nonlocal pending, batch_rows, batch_payloads, indexed
+            if pending is not None:
+                fut, done_rows = pending
+                _append(fut.result(), done_rows)
+                indexed += len(done_rows)
+                pending = None
+            if batch_payloads:
+                pending = (ex.submit(_embed_batch, batch_payloads), batch_rows)
+                batch_rows, batch_payloads = [], []
 
-def search_documents_core(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        kept = 0
+        for off, chunk in _chunks(text):
+            if kept >= MAX_CHUNKS_PER_DOC:
+                break
+            h = hashlib.blake2b(url_b, digest_size=8)
+            h.update(off.to_bytes(8, "little"))
+            h.update(chunk.encode())
+            ch = h.hexdigest()
+            if ch in _chunk_hashes or ch in seen:
+                continue
+            seen.add(ch)
+            batch_rows.append({
+                "url": url,
+                "title": title,
+                "timestamp": ts,
+                "chunk_id": f"{base}#c{kept:04d}",
+                "offset_start": off,
+                "snippet": chunk[:240],
+                "chunk_hash": ch,
+                "chunk": chunk,
+                "visits": visits_init,
+                "last_seen": ts
+            })
+            batch_payloads.append(chunk)
+            kept += 1
+            if len(batch_payloads) >= EMBED_BATCH_SIZE:
+                flush()
+        flush()  # submit the remainder
+        flush()  # drain the last in-flight batch
+
+    return {"ok": True, "indexed_chunks": indexed, "url": url, "title": title}
+
+def search_documents_batch_core(queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
     """
-    Embed query -> FAISS -> recency re-rank -> top_k dicts
-    [{url,title,snippet,chunk_id,score,timestamp}]
+    Embed all queries in one batch -> single FAISS search -> per-query
+    recency re-rank -> list of top_k hit lists (one per query).
+    One embed call and one .search(nq×d) call amortize dispatch cost
+    across the whole batch.
     """
     _ensure_loaded()
-    if _index is None or _index.ntotal == 0:
+    if not queries:
         return []
-    qv = _embed_batch([query])
+    if _index is None or _index.ntotal == 0:
+        return [[] for _ in queries]
+    qv = _embed_queries_cached(queries)
+    if hasattr(_index, "hnsw"):
+        _index.hnsw.efSearch = max(64, top_k * 8)  # recall knob for the graph search
     D, I = _index.search(qv, top_k * 4)  # oversample for recency re-rank
 
     now = time.time()
-    hits: List[Dict[str, Any]] = []
-    for idx, sim in zip(I[0], D[0]):
-        if idx < 0 or idx >= len(_meta):
-            continue
-        m = _meta[idx]
-        ts = m.get("timestamp")
-        try:
-            ts_sec = datetime.fromisoformat(ts.replace("Z","")).timestamp() if ts else now
-        except Exception:
-            ts_sec = now
-        days = max(0.0, (now - ts_sec) / 86400.0)
-        
-        # 1) Freshness (exponential decay): 1.0 today, 0.5 after HALF_LIFE_DAYS, 0.25 after 2*half-life, etc.
-        lambda_   = math.log(2) / max(1e-6, HALF_LIFE_DAYS)
-        freshness = math.exp(-lambda_ * days)  # [0..1], higher = newer
+    lambda_ = math.log(2) / max(1e-6, HALF_LIFE_DAYS)
+    results: List[List[Dict[str, Any]]] = []
+    for qi in range(len(queries)):
+        ids = I[qi]
+        valid = (ids >= 0) & (ids < len(_meta))
+        ids = ids[valid]
+        sims = D[qi][valid]
 
+        # Vectorized re-rank over the whole shortlist (no per-row datetime parsing):
+        # 1) Freshness (exponential decay): 1.0 today, 0.5 after HALF_LIFE_DAYS, etc.
+        days = np.maximum(0.0, (now - _ts_sec[ids]) / 86400.0)
+        freshness = np.exp(-lambda_ * days)  # [0..1], higher = newer
         # 2) Popularity (smoothly saturating with visits; ~0 for never, →1 as visits grow)
-        visits      = float(m.get("visits", 1))
-        popularity  = 1.0 - math.exp(-visits / 3.0)  # 3 is a soft scale; tweak if needed
-
-        # 3) Blend (weights sum ≤ 1); keep a tiny floor so recency can help even with no visits
+        popularity = 1.0 - np.exp(-_visits[ids].astype("f8") / 3.0)  # 3 is a soft scale
+        # 3) Blend (weights sum ≤ 1); semantics dominate
         hybrid = FRESHNESS_WEIGHT * freshness + POPULARITY_WEIGHT * popularity  # in [0..1]
+        scores = SIM_WEIGHT * sims + TEMP_WEIGHT * hybrid
 
-        # 4) Cap total temporal boost for stability (e.g., ≤ +25%)
-        # boost = 1.0 + min(MAX_TEMPORAL_BOOST, MAX_TEMPORAL_BOOST * hybrid)
+        # O(n) top_k selection, then sort just the survivors; only those
+        # get materialized as result dicts.
+        k = min(top_k, scores.size)
+        sel = np.argpartition(scores, scores.size - k)[scores.size - k:] if k else []
+        sel = sel[np.argsort(-scores[sel])] if k else sel
 
-        # score = float(sim * boost)
-        # Weighted blend (semantics dominate)
-        final = (SIM_WEIGHT * float(sim)) + (TEMP_WEIGHT * float(hybrid))
-        score = float(final)
+        hits: List[Dict[str, Any]] = []
+        for pos in sel:
+            i = int(ids[pos])
+            m = _meta[i]  # lazy row parse, only for the k winners' cold fields
+            hits.append({
+                "url": _urls[i],
+                "title": m.get("title",""),
+                "snippet": m.get("snippet") or m.get("chunk","")[:240],
+                "chunk_id": m.get("chunk_id",""),
+                "score": float(scores[pos]),
+                # rendered from the numeric column only here, at serialization
+                "timestamp": datetime.utcfromtimestamp(_ts_sec[i]).isoformat() + "Z"
+            })
+        results.append(hits)
+    return results
 
-        hits.append({
-            "url": m.get("url",""),
-            "title": m.get("title",""),
-            "snippet": m.get("snippet") or m.get("chunk","")[:240],
-            "chunk_id": m.get("chunk_id",""),
-            "score": score,
-            "timestamp": ts or datetime.utcfromtimestamp(now).isoformat() + "Z"
-        })
-
-    hits.sort(key=lambda x: x["score"], reverse=True)
-    return hits[:top_k]
+def search_documents_core(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    """
+    Embed query -> FAISS -> recency re-rank -> top_k dicts
+    [{url,title,snippet,chunk_id,score,timestamp}]
+    """
+    return search_documents_batch_core([query], top_k)[0]
 
 def process_documents_core(directory: str) -> Dict[str, Any]:
     """
     Batch ingest from a folder: convert to text via MarkItDown, then index.
+    Conversion runs across INGEST_WORKERS threads; indexing stays on the
+    calling thread (FAISS add isn't thread-safe) and overlaps with the
+    conversions still in flight.
     """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
     from markitdown import MarkItDown
-    md = MarkItDown()
+
+    local = threading.local()  # one MarkItDown per worker thread
+
+    def _convert_one(path: Path) -> Tuple[str, str, str]:
+        md = getattr(local, "md", None)
+        if md is None:
+            md = local.md = MarkItDown()
+        try:
+            r = md.convert(str(path))
+            return str(path), path.stem, r.text_content or ""
+        except Exception:
+            return str(path), path.stem, ""
+
+    paths = [
+        Path(root) / f
+        for root, _, files in os.walk(directory)
+        for f in files
+        if not f.startswith(".")
+    ]
     added = 0
-    for root, _, files in os.walk(directory):
-        for f in files:
-            if f.startswith("."):
-                continue
-            path = Path(root) / f
-            try:
-                r = md.convert(str(path))
-                text = r.text_content or ""
-                if not text.strip():
-                    continue
-                url = str(path)
-                title = path.stem
-                added += index_page_core(url, title, text)["indexed_chunks"]
-            except Exception:
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as ex:
+        for url, title, text in ex.map(_convert_one, paths):
+            if not text.strip():
                 continue
+            added += index_page_core(url, title, text)["indexed_chunks"]
     return {"ok": True, "indexed_chunks": added}
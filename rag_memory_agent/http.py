@@ -1,8 +1,8 @@
 # rag_memory_agent/http.py
 from fastapi import FastAPI, Query
 from fastapi.responses import JSONResponse
-from .core import index_page_core, search_documents_core, visit_url_core
-from .models import IndexPageIn, VisitIn
+from .core import index_page_core, search_documents_core, search_documents_batch_core, visit_url_core
+from .models import IndexPageIn, SearchBatchIn, VisitIn
 
 
 app = FastAPI(title="Web Memory HTTP API")
@@ -15,6 +15,10 @@ def http_index_page(payload: IndexPageIn):
 def http_search(q: str = Query(...), top_k: int = 5):
     return JSONResponse(search_documents_core(q, top_k=top_k))
 
+@app.post("/search_batch")
+def http_search_batch(payload: SearchBatchIn):
+    return JSONResponse(search_documents_batch_core(payload.queries, top_k=payload.top_k))
+
 @app.post("/visit")
 def http_visit(payload: VisitIn):
     return visit_url_core(payload.url)
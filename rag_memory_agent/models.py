@@ -16,6 +16,10 @@ class IndexPageIn(BaseModel):
 
 class VisitIn(BaseModel):
     url: str
+
+class SearchBatchIn(BaseModel):
+    queries: List[str]
+    top_k: int = 5
     
 class SearchHit(BaseModel):
     url: str
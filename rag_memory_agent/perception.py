@@ -1,16 +1,60 @@
 # rag_memory_agent/perception.py
 from __future__ import annotations
+import hashlib
 import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+# orjson parses ~2-3x faster than stdlib json; fall back when not installed
+try:
+    from orjson import loads as _loads, dumps as _dumps
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda obj: json.dumps(obj, ensure_ascii=False).encode()  # noqa: E731
+
 from .models import PerceptionOut
-from .config import GEMINI_API_KEY, GEMINI_MODEL_PERCEPTION
+from .config import (
+    GEMINI_API_KEY, GEMINI_MODEL_PERCEPTION, GEMINI_MAX_CONCURRENCY,
+    PERCEPTION_CACHE_ENABLED, PERCEPTION_CACHE_SIZE,
+    PERCEPTION_SEMCACHE_ENABLED, PERCEPTION_SEMCACHE_THRESHOLD, PERCEPTION_SEMCACHE_SIZE,
+    PERCEPTION_DISK_CACHE_ENABLED, PERCEPTION_DISK_CACHE_TTL, PERCEPTION_DB_PATH,
+)
+
+__all__ = ["perceive", "aperceive", "perceive_batch"]
+
 # We'll import google.genai only if a key exists
 _client = None
+_client_lock = threading.Lock()  # the prewarm thread may race the first request
 
 def _gemini_client_once():
     global _client
-    if _client is None:
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is not None:
+            return _client
         import google.genai as genai  # lazy import (only when key exists)
-        _client = genai.Client(api_key=GEMINI_API_KEY)
+        try:
+            # Keep-alive pool + HTTP/2 so warm invocations skip the ~50-150ms
+            # TCP+TLS handshake; applies to both the sync and aio clients.
+            import httpx
+            from google.genai import types
+            pool = {
+                "http2": True,
+                "limits": httpx.Limits(
+                    max_connections=64, max_keepalive_connections=32, keepalive_expiry=300
+                ),
+            }
+            _client = genai.Client(
+                api_key=GEMINI_API_KEY,
+                http_options=types.HttpOptions(client_args=pool, async_client_args=dict(pool)),
+            )
+        except Exception:
+            # Older SDK without HttpOptions client_args — plain client still works
+            _client = genai.Client(api_key=GEMINI_API_KEY)
     return _client
 
 _GEMINI_PROMPT = """You extract normalized search intents for a web-memory RAG agent.
@@ -25,35 +69,411 @@ User: "find IVF vs HNSW explanation"
 JSON:
 """
 
+# Rules layer: sub-microsecond regexes for inputs whose intent is unambiguous,
+# checked before any cache or Gemini call (regex first, LLM when needed).
+# The lazy payload group plus trailing \s* leaves (?P<q>...) pre-trimmed, so
+# no .strip() (and no intermediate string) is needed on the match.
+_INDEX_RE = re.compile(r'^\s*index\s+(?P<q>.*?)\s*$', re.I | re.S)
+_URL_RE   = re.compile(r'^\s*(?P<q>https?://\S+)\s*$')
+
+def _rules_perception(text: str) -> PerceptionOut | None:
+    t = text or ""
+    m = _INDEX_RE.match(t)
+    if m:
+        return PerceptionOut.model_construct(cleaned_query=m['q'], intent="index", tool_hint="index_page")
+    m = _URL_RE.match(t)
+    if m:
+        # A bare URL: look up what we already know about that page
+        return PerceptionOut.model_construct(cleaned_query=m['q'], intent="semantic_search", tool_hint="search_documents")
+    return None
+
 def _fallback_perception(text: str) -> PerceptionOut:
-    t = (text or "").strip()
-    tl = t.lower()
-    if tl.startswith("index "):
-        return PerceptionOut(cleaned_query=t[6:].strip(), intent="index", tool_hint="index_page")
-    # You can add more patterns here if you’d like
-    return PerceptionOut(cleaned_query=t, intent="semantic_search", tool_hint="search_documents")
+    out = _rules_perception(text)
+    if out is not None:
+        return out
+    return PerceptionOut.model_construct(cleaned_query=(text or "").strip(), intent="semantic_search", tool_hint="search_documents")
+
+# Exact-match LRU over whitespace-normalized input; only Gemini successes are
+# cached so a transient error never pins the dumber fallback result.
+_cache: OrderedDict[str, PerceptionOut] = OrderedDict()
+
+def _cache_get(key: str) -> PerceptionOut | None:
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+    return hit
+
+def _cache_put(key: str, out: PerceptionOut) -> None:
+    _cache[key] = out
+    if len(_cache) > PERCEPTION_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+# Semantic cache: small in-memory FAISS index over prior query embeddings;
+# different phrasings of the same intent reuse the cached PerceptionOut.
+_sem_index = None
+_sem_outs: list[PerceptionOut] = []
+
+def _sem_cache_search(v):
+    if _sem_index is not None and _sem_index.ntotal:
+        D, I = _sem_index.search(v, 1)
+        if D[0][0] >= PERCEPTION_SEMCACHE_THRESHOLD:
+            return _sem_outs[I[0][0]], v
+    return None, v
+
+def _sem_cache_lookup(text: str):
+    """Returns (cached result or None, query vector or None)."""
+    try:
+        from .core import _embed_batch  # same embedding model as the RAG stack
+        v = _embed_batch([text])  # (1, d) float32, L2-normalized
+    except Exception:
+        return None, None  # embedding backend down — skip the semantic tier
+    return _sem_cache_search(v)
+
+async def _asem_cache_lookup(text: str):
+    """Async twin: _embed_batch drives core's private event loop, which would
+    raise if run inside the caller's running loop — embed in a thread instead."""
+    import asyncio
+    try:
+        from .core import _embed_batch
+        v = await asyncio.to_thread(_embed_batch, [text])
+    except Exception:
+        return None, None
+    return _sem_cache_search(v)
+
+def _sem_cache_put(v, out: PerceptionOut) -> None:
+    global _sem_index, _sem_outs
+    if v is None:
+        return
+    import faiss
+    if _sem_index is None:
+        _sem_index = faiss.IndexFlatIP(v.shape[1])
+    if len(_sem_outs) >= PERCEPTION_SEMCACHE_SIZE:
+        _sem_index.reset()  # cheap FIFO-ish eviction: start a fresh generation
+        _sem_outs = []
+    _sem_index.add(v)
+    _sem_outs.append(out)
+
+# Disk tier (SQLite, WAL): the in-memory tiers vanish on restart, so every
+# cold start re-pays Gemini for inputs it has already classified. WAL keeps
+# readers off the writer's lock; one shared connection avoids per-op opens.
+_db: sqlite3.Connection | None = None
+_db_lock = threading.Lock()
+
+def _db_once() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                db = sqlite3.connect(str(PERCEPTION_DB_PATH), check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, ts INTEGER)"
+                )
+                # Sweep expired rows once per process instead of per lookup
+                db.execute(
+                    "DELETE FROM cache WHERE ts < ?",
+                    (int(time.time()) - PERCEPTION_DISK_CACHE_TTL,),
+                )
+                db.commit()
+                _db = db
+    return _db
+
+def _disk_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def _disk_get(key: str) -> PerceptionOut | None:
+    try:
+        db = _db_once()
+        with _db_lock:
+            row = db.execute(
+                "SELECT value, ts FROM cache WHERE key = ?", (_disk_key(key),)
+            ).fetchone()
+        if row is None or time.time() - row[1] > PERCEPTION_DISK_CACHE_TTL:
+            return None
+        data = _loads(row[0])
+        return PerceptionOut.model_construct(
+            cleaned_query=data.get("cleaned_query", key),
+            intent=_INTENTS.get(data.get("intent"), "semantic_search"),
+            tool_hint=_TOOLS.get(data.get("tool_hint"), "search_documents"),
+        )
+    except Exception:
+        return None  # a corrupt/locked cache file must never break perception
+
+def _disk_put(key: str, out: PerceptionOut) -> None:
+    try:
+        db = _db_once()
+        with _db_lock:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+                (_disk_key(key), _dumps(out.model_dump()), int(time.time())),
+            )
+            db.commit()
+    except Exception:
+        pass
+
+# Shared pieces of the sync and async paths
+def _caches_lookup(key: str):
+    """Check exact memory, then disk, then the semantic tier. Returns (hit or None, query vector or None)."""
+    if PERCEPTION_CACHE_ENABLED:
+        hit = _cache_get(key)
+        if hit is not None:
+            return hit, None
+    if PERCEPTION_DISK_CACHE_ENABLED:
+        hit = _disk_get(key)
+        if hit is not None:
+            if PERCEPTION_CACHE_ENABLED:
+                _cache_put(key, hit)  # promote so repeats stay in memory
+            return hit, None
+    if PERCEPTION_SEMCACHE_ENABLED:
+        return _sem_cache_lookup(key)
+    return None, None
+
+async def _acaches_lookup(key: str):
+    """_caches_lookup for async callers; only the embedding hop moves off-loop."""
+    if PERCEPTION_CACHE_ENABLED:
+        hit = _cache_get(key)
+        if hit is not None:
+            return hit, None
+    if PERCEPTION_DISK_CACHE_ENABLED:
+        hit = _disk_get(key)
+        if hit is not None:
+            if PERCEPTION_CACHE_ENABLED:
+                _cache_put(key, hit)  # promote so repeats stay in memory
+            return hit, None
+    if PERCEPTION_SEMCACHE_ENABLED:
+        return await _asem_cache_lookup(key)
+    return None, None
+
+def _caches_store(key: str, qv, out: PerceptionOut) -> None:
+    if PERCEPTION_CACHE_ENABLED:
+        _cache_put(key, out)
+    if PERCEPTION_DISK_CACHE_ENABLED:
+        _disk_put(key, out)
+    if PERCEPTION_SEMCACHE_ENABLED:
+        _sem_cache_put(qv, out)
+
+# Split once at import: .replace() rescanned the whole prompt per call and
+# would substitute at the wrong spot if "JSON:" ever appeared in an example.
+_PROMPT_PREFIX, _PROMPT_SUFFIX = _GEMINI_PROMPT.rsplit("JSON:\n", 1)
+
+def _build_prompt(text: str) -> str:
+    return f"{_PROMPT_PREFIX}User: {text}\nJSON:\n{_PROMPT_SUFFIX}"
+
+# Canonical singletons for the closed label sets: json parsing returns fresh
+# strings each call, which defeats identity comparison and duplicates the same
+# few labels across every cached PerceptionOut. Mapping through these returns
+# the one interned instance per label.
+_INTENTS = {"semantic_search": "semantic_search", "index": "index", "qa": "qa"}
+_TOOLS   = {"search_documents": "search_documents", "index_page": "index_page"}
+
+# Gemini sometimes wraps output in ```json fences or adds a short preamble;
+# losing those replies to the dumb fallback is an accuracy hit, not just a
+# retry cost. Scope out the JSON payload cheaply before parsing.
+_FENCE_RE = re.compile(r'^```(?:json)?\s*(.*?)\s*```\s*$', re.S)
+_JSON_RE  = re.compile(r'\{.*\}|\[.*\]', re.S)
+
+def _extract_json(raw: str) -> str:
+    raw = raw.strip()
+    m = _FENCE_RE.match(raw)
+    if m:
+        raw = m.group(1)
+    if raw and raw[0] not in "{[":  # only pay the regex scan when needed
+        m = _JSON_RE.search(raw)
+        if m:
+            raw = m.group(0)
+    return raw
+
+def _parse_response(text: str, raw: str | None) -> PerceptionOut:
+    # Schema-constrained output is valid PerceptionOut JSON in one shot;
+    # keep the tolerant path for anything that slips through anyway.
+    raw = raw or "{}"
+    try:
+        out = PerceptionOut.model_validate_json(raw)
+        out.intent = _INTENTS.get(out.intent, out.intent)
+        out.tool_hint = _TOOLS.get(out.tool_hint, out.tool_hint)
+        return out
+    except Exception:
+        pass
+    data = _loads(_extract_json(raw))
+    # Trusted shapes (str defaults applied below) skip Pydantic revalidation
+    return PerceptionOut.model_construct(
+        cleaned_query=data.get("cleaned_query", (text or "").strip()),
+        intent=_INTENTS.get(data.get("intent"), "semantic_search"),
+        tool_hint=_TOOLS.get(data.get("tool_hint"), "search_documents"),
+    )
+
+# response_schema makes Gemini emit exactly the PerceptionOut fields as JSON —
+# no prose, no fences, and fewer output tokens than free-form replies.
+_BATCH_SUB_SIZE = 16  # keep one request comfortably under output-token limits
+
+# Expected replies are ~30 tokens; capping output bounds tail latency since
+# generation time is roughly linear in output length.
+_GEN_CONFIG = {
+    "temperature": 0.2,
+    "response_mime_type": "application/json",
+    "response_schema": PerceptionOut,
+    "max_output_tokens": 64,
+}
+_BATCH_GEN_CONFIG = {
+    "temperature": 0.2,
+    "response_mime_type": "application/json",
+    "response_schema": list[PerceptionOut],
+    "max_output_tokens": 64 * _BATCH_SUB_SIZE,
+}
+if "2.5" in GEMINI_MODEL_PERCEPTION:
+    # Thinking models would otherwise spend budget reasoning about a 3-field
+    # classification; older models reject thinking_config, hence the gate.
+    _GEN_CONFIG["thinking_config"] = {"thinking_budget": 0}
+    _BATCH_GEN_CONFIG["thinking_config"] = {"thinking_budget": 0}
 
 def perceive(text: str) -> PerceptionOut:
     # If no key, use manual fallback
     if not GEMINI_API_KEY:
         return _fallback_perception(text)
 
+    # High-confidence rule matches skip the LLM (and the caches) entirely
+    out = _rules_perception(text)
+    if out is not None:
+        return out
+
+    key = " ".join((text or "").split())
+    hit, qv = _caches_lookup(key)
+    if hit is not None:
+        return hit
+
     # Gemini path
     try:
         client = _gemini_client_once()
-        prompt = _GEMINI_PROMPT.replace("JSON:\n", f"User: {text}\nJSON:\n")
         resp = client.models.generate_content(
             model=GEMINI_MODEL_PERCEPTION,
-            contents=[{"role":"user","parts":[{"text":prompt}]}],
-            config={"temperature":0.2}
-        )
-        raw = (resp.text or "{}").strip()
-        data = json.loads(raw)
-        return PerceptionOut(
-            cleaned_query=data.get("cleaned_query", (text or "").strip()),
-            intent=data.get("intent", "semantic_search"),
-            tool_hint=data.get("tool_hint", "search_documents"),
+            contents=[{"role":"user","parts":[{"text":_build_prompt(text)}]}],
+            config=_GEN_CONFIG,
         )
+        out = _parse_response(text, resp.text)
+        _caches_store(key, qv, out)
+        return out
     except Exception:
         # If Gemini errors (rate limit/network/etc.), gracefully fall back
         return _fallback_perception(text)
+
+_BATCH_PROMPT = """You extract normalized search intents for a web-memory RAG agent.
+For each user text in the JSON array of inputs, output one object with keys:
+cleaned_query, intent, tool_hint. Return a compact JSON array ONLY, same order
+and length as the inputs.
+- intents: "semantic_search" (default), "index" (explicit index request), or "qa".
+- tool_hint: "search_documents" for search; "index_page" for indexing.
+Inputs: {inputs}
+JSON:
+"""
+
+def perceive_batch(texts: list[str]) -> list[PerceptionOut]:
+    """
+    Perceive many inputs with one Gemini round-trip per sub-batch of 16
+    instead of one per text (bulk reindex, evaluation, replay). Cached
+    items are served locally; any parse problem falls back per item.
+    """
+    if not texts:
+        return []
+    if not GEMINI_API_KEY:
+        return [_fallback_perception(t) for t in texts]
+
+    results: list[PerceptionOut | None] = [None] * len(texts)
+    todo: list[tuple[int, str, Any]] = []  # (position, cache key, query vector)
+    for i, t in enumerate(texts):
+        out = _rules_perception(t)
+        if out is not None:
+            results[i] = out
+            continue
+        key = " ".join((t or "").split())
+        hit, qv = _caches_lookup(key)
+        if hit is not None:
+            results[i] = hit
+        else:
+            todo.append((i, key, qv))
+
+    for s in range(0, len(todo), _BATCH_SUB_SIZE):
+        sub = todo[s:s + _BATCH_SUB_SIZE]
+        sub_texts = [texts[i] for i, _, _ in sub]
+        try:
+            client = _gemini_client_once()
+            prompt = _BATCH_PROMPT.format(inputs=json.dumps(sub_texts, ensure_ascii=False))
+            resp = client.models.generate_content(
+                model=GEMINI_MODEL_PERCEPTION,
+                contents=[{"role":"user","parts":[{"text":prompt}]}],
+                config=_BATCH_GEN_CONFIG,
+            )
+            data = _loads(_extract_json(resp.text or "[]"))
+            if not isinstance(data, list) or len(data) != len(sub):
+                raise ValueError("batch shape mismatch")
+            for (i, key, qv), item in zip(sub, data):
+                out = PerceptionOut.model_construct(
+                    cleaned_query=item.get("cleaned_query", (texts[i] or "").strip()),
+                    intent=_INTENTS.get(item.get("intent"), "semantic_search"),
+                    tool_hint=_TOOLS.get(item.get("tool_hint"), "search_documents"),
+                )
+                _caches_store(key, qv, out)
+                results[i] = out
+        except Exception:
+            for i, _, _ in sub:
+                results[i] = _fallback_perception(texts[i])
+    return results  # type: ignore[return-value]
+
+# Bounded concurrency + backoff: unbounded async fan-out trips the account's
+# RPM/TPM tier and the resulting 429 retries cost more than just queueing.
+_gemini_sem = None
+
+def _gemini_sem_once():
+    global _gemini_sem
+    if _gemini_sem is None:
+        import asyncio
+        _gemini_sem = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+    return _gemini_sem
+
+def _is_rate_limited(exc: Exception) -> bool:
+    if getattr(exc, "code", None) == 429 or getattr(exc, "status_code", None) == 429:
+        return True
+    msg = str(exc)
+    return "RESOURCE_EXHAUSTED" in msg or "429" in msg
+
+async def _agenerate(client, prompt: str):
+    """generate_content with semaphore gating and jittered exponential backoff on 429s."""
+    import asyncio
+    import random
+    delay = 0.5
+    for attempt in range(5):
+        async with _gemini_sem_once():
+            try:
+                return await client.aio.models.generate_content(
+                    model=GEMINI_MODEL_PERCEPTION,
+                    contents=[{"role":"user","parts":[{"text":prompt}]}],
+                    config=_GEN_CONFIG,
+                )
+            except Exception as e:
+                if attempt == 4 or not _is_rate_limited(e):
+                    raise
+        await asyncio.sleep(delay + random.uniform(0, delay))
+        delay = min(8.0, delay * 2)
+
+async def aperceive(text: str) -> PerceptionOut:
+    """Async twin of perceive(); lets callers overlap perception with retrieval."""
+    if not GEMINI_API_KEY:
+        return _fallback_perception(text)
+
+    out = _rules_perception(text)
+    if out is not None:
+        return out
+
+    key = " ".join((text or "").split())
+    hit, qv = await _acaches_lookup(key)
+    if hit is not None:
+        return hit
+
+    try:
+        client = _gemini_client_once()
+        resp = await _agenerate(client, _build_prompt(text))
+        out = _parse_response(text, resp.text)
+        _caches_store(key, qv, out)
+        return out
+    except Exception:
+        return _fallback_perception(text)